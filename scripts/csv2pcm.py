@@ -10,14 +10,182 @@ import sys
 import os
 import csv
 import numpy as np
+import pandas as pd
 import argparse
 from datetime import datetime
 
+try:
+    from numba import njit, prange
+except ImportError:
+    # 未安装numba时使用numpy实现
+    njit = None
+
+# 分块读取时每块的行数，峰值内存与块大小成正比而与文件大小无关
+CHUNK_ROWS = 1_000_000
+
+# 各数据格式的取值范围
+FORMAT_RANGES = {
+    'uint16_t': (0, 65535),
+    'int16_t': (-32768, 32767),
+}
+
+def _has_header(csv_file, sample_size=4096):
+    """
+    根据文件开头的样本判断CSV是否带表头
+    """
+    with open(csv_file, 'rb') as f:
+        sample = f.read(sample_size).decode('utf-8', errors='ignore')
+    
+    # 去掉末尾被截断的不完整行
+    if '\n' in sample:
+        sample = sample[:sample.rindex('\n') + 1]
+    
+    # 首个字段是数字时必然没有表头（Sniffer对只有一行数据的文件会误判为表头）
+    first_field = sample.split(',', 1)[0].strip()
+    if first_field.replace('.', '').replace('-', '').isdigit():
+        return False
+    
+    # 样本不足两行时Sniffer无从比较，按首个字段非数字判为表头
+    if sample.count('\n') < 2:
+        return True
+    
+    try:
+        return csv.Sniffer().has_header(sample)
+    except csv.Error:
+        return True
+
+def _count_rows(csv_file, block_size=1 << 20):
+    """
+    分块统计换行符数量，得到文件行数的上界（含表头和空行）
+    
+    复用同一个缓冲区，bytearray.count在C层扫描，不解析任何字段
+    """
+    buf = bytearray(block_size)
+    rows = 0
+    last_byte = b'\n'
+    with open(csv_file, 'rb') as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            rows += buf.count(b'\n', 0, n)
+            last_byte = buf[n - 1:n]
+    
+    # 最后一行没有换行符
+    if last_byte != b'\n':
+        rows += 1
+    return rows
+
+def _parse_row(line):
+    """解析一行为 (时间戳, 数值)，列数不足或无法解析时返回None"""
+    fields = line.split(b',')
+    if len(fields) < 2 or not fields[1].strip():
+        return None
+    try:
+        return float(fields[0]), float(fields[1])
+    except ValueError:
+        return None
+
+def _edge_timestamps(csv_file, has_header, tail_size=4096):
+    """
+    只读取首尾两个数据行的时间戳，不解析整个时间戳列
+    
+    实际采样率只需要首尾时间差：mean(diff(t)) == (t[-1] - t[0]) / (N - 1)
+    """
+    first_ts, last_ts = None, None
+    with open(csv_file, 'rb') as f:
+        if has_header:
+            f.readline()
+        for line in f:
+            row = _parse_row(line)
+            if row is not None:
+                first_ts = row[0]
+                break
+        
+        # 从文件末尾向前取一段，找到最后一个完整的数据行
+        size = f.seek(0, os.SEEK_END)
+        f.seek(max(0, size - tail_size))
+        tail = f.read().splitlines()
+        for line in reversed(tail[1:] if size > tail_size else tail):
+            row = _parse_row(line)
+            if row is not None:
+                last_ts = row[0]
+                break
+    return first_ts, last_ts
+
+def _read_chunks(csv_file, has_header, chunksize=CHUNK_ROWS):
+    """
+    分块读取CSV文件的数值列
+    
+    使用pandas的C解析器直接从内存映射的文件页解析，两遍扫描时第二遍由页缓存提供数据
+    时间戳列不解析，列数不足的行读为NaN后丢弃，每次返回一块数值数组
+    """
+    with pd.read_csv(
+        csv_file,
+        header=0 if has_header else None,
+        names=['val'],
+        usecols=[1],
+        dtype={'val': np.float64},
+        engine='c',
+        encoding='utf-8',
+        memory_map=True,
+        chunksize=chunksize
+    ) as reader:
+        for chunk in reader:
+            chunk = chunk.dropna()
+            yield chunk['val'].to_numpy(dtype=np.int32)
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def _convert_kernel(values, lo, hi, shift, scale, out_lo, out_hi, out):
+        """裁剪、减去shift、缩放、取整并限幅，多线程单遍完成"""
+        for i in prange(values.shape[0]):
+            x = np.float32(min(max(values[i], lo), hi))
+            y = np.rint((x - shift) * scale)
+            out[i] = min(max(y, out_lo), out_hi)
+else:
+    _convert_kernel = None
+
+def _convert_chunk(values, lo, hi, offset, mean, scale, out):
+    """
+    转换一块数据：裁剪、偏移、去直流、归一化，并量化写入out
+    
+    安装了numba时由编译后的并行内核单遍完成，否则用numpy实现：
+    运算均在values上原地进行（values会被修改），不产生整块大小的临时数组
+    out可以是内存映射输出文件的一段切片，结果直接落盘而不经过中间缓冲
+    """
+    if _convert_kernel is not None:
+        shift = offset + int(round(mean)) if scale == 1 else offset + mean
+        info = np.iinfo(out.dtype)
+        _convert_kernel(values, lo, hi, np.float32(shift), np.float32(scale),
+                        np.float32(info.min), np.float32(info.max), np.asarray(out))
+        return
+    
+    np.clip(values, lo, hi, out=values)
+    
+    if scale == 1:
+        # 整数减去取整后的均值，与先减均值再取整的结果相同，无需浮点中间数组
+        values -= offset + int(round(mean))
+    else:
+        # 先转换为float32进行计算，避免溢出；16位数据用单精度已足够
+        work = values.astype(np.float32)
+        work -= np.float32(offset + mean)
+        work *= np.float32(scale)
+        np.rint(work, out=work)
+        values = work
+    
+    info = np.iinfo(out.dtype)
+    np.clip(values, info.min, info.max, out=values)
+    out[:] = values
+
 def csv_to_pcm(csv_file, pcm_file, data_format='uint16_t', sample_rate=8000, 
-                normalize=True, remove_dc=True):
+                normalize=True, remove_dc=True, chunksize=CHUNK_ROWS):
     """
     将CSV文件转换为PCM文件
     
+    数据分块流式处理，需要全局统计量（去直流、归一化）时先扫描一遍统计，
+    再扫描一遍转换并写入，峰值内存只与块大小有关
+    
     参数:
     csv_file: CSV文件路径
     pcm_file: 输出PCM文件路径
@@ -25,6 +193,7 @@ def csv_to_pcm(csv_file, pcm_file, data_format='uint16_t', sample_rate=8000,
     sample_rate: 采样率 (Hz)
     normalize: 是否归一化数据
     remove_dc: 是否去除直流分量
+    chunksize: 每块读取的行数
     """
     
     print(f"正在转换 {csv_file} 到 {pcm_file}")
@@ -34,96 +203,141 @@ def csv_to_pcm(csv_file, pcm_file, data_format='uint16_t', sample_rate=8000,
     try:
         # 读取CSV文件
         print("正在读取CSV文件...")
-        timestamps = []
-        values = []
+        # 跳过表头（如果存在）
+        has_header = _has_header(csv_file)
+        if has_header:
+            print("跳过表头行")
         
-        with open(csv_file, 'r', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            
-            # 跳过表头（如果存在）
-            first_line = next(reader)
-            if not first_line[0].replace('.', '').replace('-', '').isdigit():
-                print("跳过表头行")
-            else:
-                # 第一行是数据，重新开始读取
-                timestamps.append(float(first_line[0]))
-                values.append(int(first_line[1]))
-            
-            # 读取剩余数据
-            for row in reader:
-                if len(row) >= 2:
-                    timestamps.append(float(row[0]))
-                    values.append(int(row[1]))
-        
-        print(f"读取完成，共 {len(values)} 个数据点")
-        
-        # 数据预处理
-        values = np.array(values, dtype=np.int32)
-        timestamps = np.array(timestamps)
-        
-        print(f"原始数据范围: {values.min()} 到 {values.max()}")
-        
-        # 数据格式转换
-        if data_format == 'uint16_t':
-            # uint16_t: 0 到 65535
-            if values.max() > 65535 or values.min() < 0:
-                print("警告: 数据超出uint16_t范围，将进行裁剪")
-                values = np.clip(values, 0, 65535)
+        lo, hi = FORMAT_RANGES[data_format]
+        
+        # 转换为int16_t格式（PCM通常使用有符号格式），否则保持原格式
+        if data_format == 'uint16_t' and normalize:
+            # 将uint16_t转换为int16_t
+            offset = 32768
+        else:
+            offset = 0
+        if data_format == 'uint16_t' and not normalize and not remove_dc:
+            out_dtype = np.uint16
+        else:
+            out_dtype = np.int16
+        
+        # 统计量：数据点数、原始范围、裁剪后的总和
+        stats = {'count': 0, 'raw_min': None, 'raw_max': None, 'sum': 0}
+        
+        def update_stats(values):
+            if len(values) == 0:
+                return
+            stats['count'] += len(values)
             
-            # 转换为int16_t格式（PCM通常使用有符号格式）
-            if normalize:
-                # 将uint16_t转换为int16_t
-                # 先转换为int32避免溢出，然后再转换为int16
-                values = (values.astype(np.int32) - 32768).astype(np.int16)
-            else:
-                # 保持uint16_t格式
-                values = values.astype(np.uint16)
-                
-        elif data_format == 'int16_t':
-            # int16_t: -32768 到 32767
-            if values.max() > 32767 or values.min() < -32768:
-                print("警告: 数据超出int16_t范围，将进行裁剪")
-                values = np.clip(values, -32768, 32767)
+            raw_min, raw_max = values.min(), values.max()
+            stats['raw_min'] = raw_min if stats['raw_min'] is None else min(stats['raw_min'], raw_min)
+            stats['raw_max'] = raw_max if stats['raw_max'] is None else max(stats['raw_max'], raw_max)
             
-            values = values.astype(np.int16)
+            # 只有本块超出范围时才需要裁剪副本
+            if raw_min < lo or raw_max > hi:
+                values = np.clip(values, lo, hi)
+            stats['sum'] += int(values.sum(dtype=np.int64))
+        
+        def report_raw_range():
+            print(f"读取完成，共 {stats['count']} 个数据点")
+            print(f"原始数据范围: {stats['raw_min']} 到 {stats['raw_max']}")
+            if stats['raw_max'] > hi or stats['raw_min'] < lo:
+                print(f"警告: 数据超出{data_format}范围，将进行裁剪")
+        
+        # 第一遍：去直流和归一化需要全局统计量
+        need_stats = remove_dc or normalize
+        if need_stats:
+            for values in _read_chunks(csv_file, has_header, chunksize):
+                update_stats(values)
+            if stats['count'] == 0:
+                print("错误: CSV文件中没有数据")
+                return False
+            report_raw_range()
         
         # 去除直流分量
+        mean = 0.0
         if remove_dc:
-            values = values - np.mean(values)
+            mean = stats['sum'] / stats['count'] - offset
             print("已去除直流分量")
         
         # 归一化（可选）
+        scale = 1.0
         if normalize and not remove_dc:
-            max_val = np.max(np.abs(values))
+            # 裁剪后的范围由原始范围直接得出，无需再遍历数据
+            clipped_min = min(max(stats['raw_min'], lo), hi)
+            clipped_max = min(max(stats['raw_max'], lo), hi)
+            max_val = max(offset - clipped_min, clipped_max - offset)
             if max_val > 0:
-                # 先转换为float进行计算，避免溢出
-                values = (values.astype(np.float32) / max_val * 32767).astype(np.int16)
+                scale = 32767 / max_val
                 print("已归一化数据")
         
-        print(f"处理后数据范围: {values.min()} 到 {values.max()}")
+        # 第二遍：逐块转换并写入PCM文件
+        print("正在写入PCM文件...")
+        if need_stats:
+            # 数据点数已知
+            capacity = stats['count']
+        else:
+            # 预扫描行数作为上界，写完后截断多余部分
+            capacity = _count_rows(csv_file) - (1 if has_header else 0)
+            if capacity <= 0:
+                print("错误: CSV文件中没有数据")
+                return False
+        
+        # 直接写入内存映射的输出文件
+        pcm_out = np.memmap(pcm_file, dtype=out_dtype, mode='w+', shape=(capacity,))
+        try:
+            pos = 0
+            for values in _read_chunks(csv_file, has_header, chunksize):
+                if not need_stats:
+                    update_stats(values)
+                if len(values) == 0:
+                    continue
+                if pos + len(values) > capacity:
+                    raise ValueError("数据行数超出预估的文件行数")
+                
+                _convert_chunk(values, lo, hi, offset, mean, scale,
+                               pcm_out[pos:pos + len(values)])
+                pos += len(values)
+        finally:
+            pcm_out.flush()
+            del pcm_out
+        
+        if pos < capacity:
+            os.truncate(pcm_file, pos * np.dtype(out_dtype).itemsize)
         
-        # 计算实际采样率
-        if len(timestamps) > 1:
-            time_diffs = np.diff(timestamps)
-            actual_sample_rate = 1.0 / np.mean(time_diffs)
+        if stats['count'] == 0:
+            print("错误: CSV文件中没有数据")
+            return False
+        if not need_stats:
+            report_raw_range()
+        
+        # 转换是单调不减的，处理后的范围即原始最小/最大值转换的结果
+        out_range = np.empty(2, dtype=out_dtype)
+        _convert_chunk(np.array([stats['raw_min'], stats['raw_max']]),
+                       lo, hi, offset, mean, scale, out_range)
+        out_min, out_max = out_range
+        print(f"处理后数据范围: {out_min} 到 {out_max}")
+        
+        # 计算实际采样率，时间差的均值即首尾时间差除以间隔数
+        first_ts, last_ts = _edge_timestamps(csv_file, has_header)
+        if stats['count'] > 1 and first_ts is not None and last_ts is not None and last_ts > first_ts:
+            actual_sample_rate = (stats['count'] - 1) / (last_ts - first_ts)
             print(f"实际采样率: {actual_sample_rate:.2f} Hz")
             
             # 如果实际采样率与指定采样率差异较大，给出警告
             if abs(actual_sample_rate - sample_rate) / sample_rate > 0.1:
                 print(f"警告: 实际采样率 ({actual_sample_rate:.2f} Hz) 与指定采样率 ({sample_rate} Hz) 差异较大")
         
-        # 写入PCM文件
-        print("正在写入PCM文件...")
-        with open(pcm_file, 'wb') as f:
-            values.tofile(f)
+        # 文件大小由数据点数和样本宽度确定，无需stat
+        nbytes = stats['count'] * np.dtype(out_dtype).itemsize
         
         print(f"转换完成！")
         print(f"输出文件: {pcm_file}")
-        print(f"数据点数: {len(values)}")
-        print(f"文件大小: {os.path.getsize(pcm_file)} 字节")
+        print(f"数据点数: {stats['count']}")
+        print(f"文件大小: {nbytes} 字节")
         
         # 生成音频信息文件
-        info_file = pcm_file.replace('.pcm', '_info.txt')
+        info_file = os.path.splitext(pcm_file)[0] + '_info.txt'
         with open(info_file, 'w', encoding='utf-8') as f:
             f.write(f"PCM文件信息\n")
             f.write(f"==========\n")
@@ -131,10 +345,10 @@ def csv_to_pcm(csv_file, pcm_file, data_format='uint16_t', sample_rate=8000,
             f.write(f"输出文件: {pcm_file}\n")
             f.write(f"数据格式: {data_format}\n")
             f.write(f"采样率: {sample_rate} Hz\n")
-            f.write(f"数据点数: {len(values)}\n")
-            f.write(f"时长: {len(values) / sample_rate:.3f} 秒\n")
-            f.write(f"文件大小: {os.path.getsize(pcm_file)} 字节\n")
-            f.write(f"数据范围: {values.min()} 到 {values.max()}\n")
+            f.write(f"数据点数: {stats['count']}\n")
+            f.write(f"时长: {stats['count'] / sample_rate:.3f} 秒\n")
+            f.write(f"文件大小: {nbytes} 字节\n")
+            f.write(f"数据范围: {out_min} 到 {out_max}\n")
             f.write(f"转换时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
         
         print(f"音频信息已保存到: {info_file}")
@@ -7,10 +7,9 @@
 
 import sys
 import os
-import csv
 import time
+import struct
 import threading
-from datetime import datetime
 from collections import deque
 
 import numpy as np
@@ -25,17 +24,182 @@ from PyQt5.QtGui import QFont
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
-import matplotlib.animation as animation
 import matplotlib.font_manager as fm
 from scipy import signal
-from scipy.fft import fft, fftfreq
+from scipy.fft import fft, fftfreq, rfft, rfftfreq, next_fast_len
+
+try:
+    from numba import njit
+except ImportError:
+    # 未安装numba时使用numpy实现
+    njit = None
+
+# int16_t原始值到加速度值的换算系数（除以3277）
+ACCELERATION_SCALE = np.float32(1.0 / 3277.0)
+
+# 接收线程与界面共享的int16_t样本环形缓冲区长度
+SHARED_BUFFER_SIZE = 1 << 18
+
+# 本地时区相对UTC的偏移缓存 [15分钟时段序号, 偏移秒数]，时区切换（如夏令时）都发生在15分钟整点，同一时段内只查询一次
+_utc_offset = [None, 0]
+
+# 界面定时更新周期（毫秒）和图表最短更新间隔（秒）
+UI_INTERVAL_MS = 100
+PLOT_INTERVAL = 0.2
+
+# 记录数据缓冲区的初始长度，写满后按两倍扩容
+RECORD_INITIAL_SIZE = 1 << 16
+
+if njit is not None:
+    @njit(cache=True, fastmath=True)
+    def _frame_and_window(x, hop, window, out):
+        """分帧、每帧去均值并加窗，单遍写入out，不产生中间数组"""
+        length = window.shape[0]
+        for m in range(out.shape[0]):
+            start = m * hop
+            mean = np.float32(0.0)
+            for k in range(length):
+                mean += x[start + k]
+            mean /= length
+            for k in range(length):
+                out[m, k] = (x[start + k] - mean) * window[k]
+else:
+    _frame_and_window = None
+
+def frame_and_window(x, hop, window):
+    """按帧移hop把x切分为帧，每帧去除均值后乘以窗函数，返回 (帧数, 窗口长度) 的数组"""
+    length = len(window)
+    if _frame_and_window is not None:
+        out = np.empty(((len(x) - length) // hop + 1, length), dtype=np.float32)
+        _frame_and_window(x, hop, window, out)
+        return out
+    
+    # 滑动窗口视图，不拷贝
+    frames = np.lib.stride_tricks.sliding_window_view(x, length)[::hop]
+    return (frames - frames.mean(axis=1, keepdims=True)) * window
+
+def _fmt_hms(ts):
+    """把时间戳格式化为本地时间 HH:MM:SS.mmm，用整数运算代替datetime.fromtimestamp和strftime"""
+    period = int(ts // 900)
+    if period != _utc_offset[0]:
+        _utc_offset[0], _utc_offset[1] = period, time.localtime(ts).tm_gmtoff
+    ts += _utc_offset[1]
+    s = int(ts)
+    ms = int((ts - s) * 1000)
+    return f"{s // 3600 % 24:02d}:{s // 60 % 60:02d}:{s % 60:02d}.{ms:03d}"
+
+def minmax_decimate(t, y, n_out):
+    """把数据按顺序分成n_out段，每段保留最小值和最大值，返回 (时间, 数值)，共2*n_out个点"""
+    starts = np.linspace(0, len(y), n_out, endpoint=False).astype(np.intp)
+    y_out = np.empty(2 * n_out, dtype=y.dtype)
+    y_out[0::2] = np.minimum.reduceat(y, starts)
+    y_out[1::2] = np.maximum.reduceat(y, starts)
+    return np.repeat(t[starts], 2), y_out
+
+def fit_limits(current, lo, hi):
+    """数据超出当前坐标范围或只占其一半以下时返回留有10%余量的新范围，否则原样返回当前范围"""
+    span = hi - lo
+    if current[0] <= lo and hi <= current[1] and span >= (current[1] - current[0]) / 2:
+        return current
+    margin = span * 0.1 or 1.0
+    return (float(lo - margin), float(hi + margin))
+
+class RingBuffer:
+    """定长环形缓冲区，数据连续存放在numpy数组中，写满后覆盖最旧的数据"""
+    
+    def __init__(self, capacity, dtype):
+        self.capacity = capacity
+        self.data = np.zeros(capacity, dtype=dtype)
+        self.write_idx = 0  # 下一个写入位置
+        self.count = 0  # 有效数据个数
+    
+    def __len__(self):
+        return self.count
+    
+    def extend(self, values):
+        """追加一批数据，最多分两段拷贝（跨越数组末尾时回绕）"""
+        values = np.asarray(values)[-self.capacity:]
+        n = len(values)
+        end = self.write_idx + n
+        if end <= self.capacity:
+            self.data[self.write_idx:end] = values
+        else:
+            first = self.capacity - self.write_idx
+            self.data[self.write_idx:] = values[:first]
+            self.data[:n - first] = values[first:]
+        self.write_idx = end % self.capacity
+        self.count = min(self.capacity, self.count + n)
+    
+    def get(self, n=None):
+        """按时间顺序返回最新的n个数据（默认全部），未回绕时返回视图，调用方不应修改"""
+        n = self.count if n is None else min(n, self.count)
+        start = (self.write_idx - n) % self.capacity
+        if start + n <= self.capacity:
+            return self.data[start:start + n]
+        return np.concatenate((self.data[start:], self.data[:self.write_idx]))
+    
+    def clear(self):
+        self.write_idx = 0
+        self.count = 0
+
+class StatsRingBuffer(RingBuffer):
+    """维护缓冲区内数据的和与平方和的环形缓冲区，均值和标准差无需遍历整个缓冲区"""
+    
+    def __init__(self, capacity, dtype):
+        super().__init__(capacity, dtype)
+        self.sum = 0.0
+        self.sumsq = 0.0
+    
+    def extend(self, values):
+        """追加数据，加上新数据并减去被覆盖的最旧数据的贡献"""
+        values = np.asarray(values)[-self.capacity:]
+        n = len(values)
+        evict = max(0, self.count + n - self.capacity)
+        if 0 < evict < self.count:
+            start = (self.write_idx - self.count) % self.capacity
+            old = self.data[start:start + evict]
+            if len(old) < evict:
+                old = np.concatenate((old, self.data[:evict - len(old)]))
+            self.sum -= float(np.sum(old, dtype=np.float64))
+            self.sumsq -= float(np.dot(old, old))
+        
+        wrapped = self.write_idx + n >= self.capacity
+        super().extend(values)
+        if wrapped:
+            # 写入位置回绕时按缓冲区内的数据重新精确求和，避免增减累积的舍入误差
+            valid = self.data[:self.count]
+            self.sum = float(np.sum(valid, dtype=np.float64))
+            self.sumsq = float(np.dot(valid, valid))
+        else:
+            self.sum += float(np.sum(values, dtype=np.float64))
+            self.sumsq += float(np.dot(values, values))
+    
+    def mean_std(self):
+        """返回缓冲区内数据的均值和标准差"""
+        mean = self.sum / self.count
+        return mean, np.sqrt(max(0.0, self.sumsq / self.count - mean * mean))
+    
+    def clear(self):
+        super().clear()
+        self.sum = 0.0
+        self.sumsq = 0.0
 
 class SerialThread(QThread):
     """串口数据接收线程"""
-    data_received = pyqtSignal(list)
+    data_received = pyqtSignal(object)  # 文本模式下一行的数值（np.ndarray）
+    data_available = pyqtSignal(int)  # int16_t模式下新写入共享缓冲区的样本数
     error_occurred = pyqtSignal(str)
     
-    def __init__(self, port, baudrate, data_format='int16_t', byteorder='little'):
+    # int16_t模式下攒够EMIT_BYTES字节或距上次发送超过EMIT_INTERVAL秒才发送一次信号
+    EMIT_BYTES = 1024
+    EMIT_INTERVAL = 0.004
+    # 少于该字节数的批次用struct解析，避免为几个样本创建numpy数组
+    SMALL_BATCH_BYTES = 128
+    # 驱动接收缓冲区大小和单次读取的最大字节数
+    RX_BUFFER_SIZE = 1 << 20
+    MAX_READ_BYTES = 1 << 16
+    
+    def __init__(self, port, baudrate, data_format='int16_t', byteorder='little', shared_buf=None):
         super().__init__()
         self.port = port
         self.baudrate = baudrate
@@ -43,6 +207,14 @@ class SerialThread(QThread):
         self.byteorder = byteorder
         self.serial = None
         self.running = False
+        # int16_t样本的numpy数据类型，按字节序选择
+        self.sample_dtype = np.dtype('<i2' if byteorder == 'little' else '>i2')
+        self.sample_struct = struct.Struct('<h' if byteorder == 'little' else '>h')
+        # 已读取但尚未发送的字节
+        self._pending = bytearray()
+        # int16_t样本写入共享环形缓冲区（单生产者单消费者），write_idx为累计写入的样本数，只由本线程修改
+        self.shared_buf = shared_buf if shared_buf is not None else np.zeros(SHARED_BUFFER_SIZE, dtype=np.int16)
+        self.write_idx = 0
         
     def run(self):
         try:
@@ -51,37 +223,49 @@ class SerialThread(QThread):
                 baudrate=self.baudrate,
                 timeout=1
             )
+            self.enable_low_latency()
+            self.enlarge_rx_buffer()
             self.running = True
+            last_emit = time.perf_counter()
             
             while self.running:
-                if self.serial.in_waiting:
-                    if self.data_format == 'int16_t':
-                        # int16_t模式：每两个字节解析为一个int16_t
-                        if self.serial.in_waiting >= 2:
-                            # 读取两个字节
-                            byte1 = self.serial.read(1)
-                            byte2 = self.serial.read(1)
-                            
-                            if len(byte1) == 1 and len(byte2) == 1:
-                                # 组合为16位整数
-                                int16_value = int.from_bytes(byte1 + byte2, byteorder=self.byteorder, signed=True)
-                                # int16_value = int16_value / 3277.0
-                                self.data_received.emit([int16_value])
-                    else:
-                        # 文本模式：按行读取并解析
-                        data = self.serial.readline()
-                        try:
-                            # 尝试解析数据为浮点数
-                            values = [float(x.strip()) for x in data.decode().strip().split(',')]
-                            self.data_received.emit(values)
-                        except (ValueError, UnicodeDecodeError):
-                            # 如果解析失败，发送原始字节数据
-                            self.data_received.emit([float(x) for x in data])
+                if self.data_format == 'int16_t':
+                    # int16_t模式：一次读取缓冲区中所有可用字节（最多MAX_READ_BYTES），无数据时阻塞等待（最长为超时时间）
+                    self._pending += self.serial.read(max(2, min(self.serial.in_waiting, self.MAX_READ_BYTES)))
+                    
+                    # 攒够一批或超过发送间隔才发送，减少跨线程信号的次数
+                    now = time.perf_counter()
+                    if len(self._pending) >= self.EMIT_BYTES or now - last_emit >= self.EMIT_INTERVAL:
+                        # 每两个字节解析为一个int16_t，不足一个样本的字节留到下次
+                        usable = len(self._pending) & ~1
+                        if usable:
+                            batch = self._pending[:usable]
+                            del self._pending[:usable]
+                            if usable >= self.SMALL_BATCH_BYTES:
+                                samples = np.frombuffer(batch, dtype=self.sample_dtype)
+                            else:
+                                samples = [v for (v,) in self.sample_struct.iter_unpack(batch)]
+                            self.write_shared(samples)
+                            self.data_available.emit(len(samples))
+                        last_emit = now
+                elif self.serial.in_waiting:
+                    # 文本模式：按行读取并解析
+                    data = self.serial.readline()
+                    try:
+                        # 按逗号切分后由numpy在C层一次解析为浮点数组
+                        values = np.array(data.split(b','), dtype=np.float64)
+                        self.data_received.emit(values)
+                    except ValueError:
+                        # 无法解析的行（如连接时截断的半行）直接丢弃
+                        pass
                         
         except serial.SerialException as e:
-            self.error_occurred.emit(f"串口错误: {str(e)}")
+            # stop()关闭串口会使阻塞中的read抛出异常，此时不是错误
+            if self.running:
+                self.error_occurred.emit(f"串口错误: {str(e)}")
         except Exception as e:
-            self.error_occurred.emit(f"未知错误: {str(e)}")
+            if self.running:
+                self.error_occurred.emit(f"未知错误: {str(e)}")
         finally:
             if self.serial and self.serial.is_open:
                 try:
@@ -89,6 +273,38 @@ class SerialThread(QThread):
                 except Exception as e:
                     print(f"关闭串口时出错: {e}")
     
+    def write_shared(self, samples):
+        """把一批样本写入共享环形缓冲区，先写数据再更新write_idx，读端只读取write_idx之前的数据"""
+        size = len(self.shared_buf)
+        total = len(samples)
+        samples = samples[-size:]
+        n = len(samples)
+        start = (self.write_idx + total - n) % size
+        first = min(n, size - start)
+        self.shared_buf[start:start + first] = samples[:first]
+        self.shared_buf[:n - first] = samples[first:]
+        self.write_idx += total
+    
+    def enable_low_latency(self):
+        """开启串口低延迟模式，USB串口驱动收到数据后立即上报而不是攒满定时器周期"""
+        # 仅pyserial的POSIX实现支持（设置ASYNC_LOW_LATENCY标志），其他平台保持默认
+        if not hasattr(self.serial, 'set_low_latency_mode'):
+            return
+        try:
+            self.serial.set_low_latency_mode(True)
+        except (ValueError, OSError) as e:
+            print(f"开启低延迟模式失败: {e}")
+    
+    def enlarge_rx_buffer(self):
+        """增大驱动的接收缓冲区，界面短暂卡顿时数据留在驱动中而不是溢出丢失"""
+        # 仅pyserial的Windows实现支持（调用SetupComm），其他平台由驱动自行管理
+        if not hasattr(self.serial, 'set_buffer_size'):
+            return
+        try:
+            self.serial.set_buffer_size(rx_size=self.RX_BUFFER_SIZE)
+        except (ValueError, OSError, serial.SerialException) as e:
+            print(f"设置接收缓冲区失败: {e}")
+    
     def stop(self):
         self.running = False
         if self.serial and self.serial.is_open:
@@ -103,11 +319,20 @@ class SerialMonitor(QMainWindow):
     def __init__(self):
         super().__init__()
         self.serial_thread = None
-        self.data_buffer = deque(maxlen=1000)  # 数据缓冲区
-        self.acceleration_buffer = deque(maxlen=1000)  # 加速度数据缓冲区
+        self._is_int16 = False  # 当前连接是否为int16_t模式，连接时确定
+        # 与接收线程共享的int16_t样本缓冲区，read_idx为界面已取走的累计样本数
+        self.shared_buf = np.zeros(SHARED_BUFFER_SIZE, dtype=np.int16)
+        self.read_idx = 0
+        # 上一批int16_t样本的时间戳，新一批样本在它与当前时间之间均匀分布
+        self._last_ts = time.time()
+        self.time_buffer = RingBuffer(1000, np.float64)  # 数据时间戳缓冲区
+        self.value_buffer = RingBuffer(1000, np.float64)  # 数据缓冲区（文本模式取每行第一个数值）
+        self.acceleration_buffer = StatsRingBuffer(1000, np.float32)  # 加速度数据缓冲区
         self.is_recording = False
-        self.recorded_data = []
-        self.animation = None
+        # 记录的时间戳和数值，rec_n为已记录的数据点数
+        self.rec_ts = np.empty(RECORD_INITIAL_SIZE, dtype=np.float64)
+        self.rec_val = np.empty(RECORD_INITIAL_SIZE, dtype=np.float64)
+        self.rec_n = 0
         self.bytes_received = 0
         self.data_points = 0
         
@@ -118,11 +343,12 @@ class SerialMonitor(QMainWindow):
         self.sample_rate = 1000  # 默认采样率
         self.window_length = 256  # FFT窗口长度
         self.overlap = 128  # 重叠长度
+        self.max_freq = 15000  # 显示的最大频率
+        self.prepare_fft()
         
-        # 性能优化：添加UI更新定时器
-        self.ui_update_timer = QTimer()
-        self.ui_update_timer.timeout.connect(self.update_ui)
-        self.ui_update_timer.start(100)  # 100ms更新一次UI
+        # 性能优化：界面和图表由同一个单次定时器依次更新
+        self.ui_interval_ms = UI_INTERVAL_MS
+        self._last_plot = 0.0
         
         # 数据接收缓冲
         self.pending_data = []
@@ -130,8 +356,12 @@ class SerialMonitor(QMainWindow):
         self.last_perf_check = time.time()
         self.ui_update_count = 0
         
+        # 有新数据或参数变化时才重新计算图表
+        self._plot_dirty = False
+        
         self.init_ui()
         self.init_plot()
+        QTimer.singleShot(self.ui_interval_ms, self._tick)
         
         # 初始化信息显示
         if hasattr(self, 'info_text'):
@@ -216,6 +446,8 @@ class SerialMonitor(QMainWindow):
         self.data_display = QTextEdit()
         self.data_display.setMaximumHeight(150)
         self.data_display.setFont(QFont("Consolas", 9))
+        # 限制显示行数，超出时由Qt自动丢弃最旧的行
+        self.data_display.document().setMaximumBlockCount(100)
         data_layout.addWidget(self.data_display)
         
         layout.addWidget(data_group)
@@ -292,7 +524,8 @@ class SerialMonitor(QMainWindow):
         plot_layout.addWidget(QLabel("最大频率(Hz):"), 3, 0)
         self.max_freq_spin = QSpinBox()
         self.max_freq_spin.setRange(10, 20000)
-        self.max_freq_spin.setValue(15000)
+        self.max_freq_spin.setValue(self.max_freq)
+        self.max_freq_spin.valueChanged.connect(self.on_max_freq_changed)
         plot_layout.addWidget(self.max_freq_spin, 3, 1)
         
         # 清除图表按钮
@@ -345,11 +578,30 @@ class SerialMonitor(QMainWindow):
         self.lines = []
         self.times = deque(maxlen=1000)
         self.values = deque(maxlen=1000)
+        self.wave_line = None  # 波形图曲线，重复使用只更新数据
+        self.spec_image = None  # 时频图图像，重复使用只更新数据
+        self.spec_image_key = None  # 创建图像时的采样率、FFT参数和数据形状
         
-        # 设置动画更新（降低更新频率以提高性能）
-        self.animation = animation.FuncAnimation(
-            self.figure, self.update_plot, interval=200, blit=False, cache_frame_data=False
-        )
+        # 使用blit只重画曲线/图像：整图重绘后缓存不含动态元素的背景，坐标轴和颜色条变化时由更新函数整图重绘
+        self._background = None
+        self.canvas.mpl_connect('draw_event', self.on_canvas_draw)
+    
+    def on_canvas_draw(self, event):
+        """整图重绘后缓存坐标轴背景，并画上动态元素（整图重绘不包含animated的元素）"""
+        self._background = self.canvas.copy_from_bbox(self.ax.bbox)
+        for artist in self.ax.get_children():
+            if artist.get_animated():
+                self.ax.draw_artist(artist)
+    
+    def blit_artists(self, artists):
+        """在缓存的背景上只重画给定的元素并刷新坐标轴区域"""
+        if self._background is None:
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self._background)
+        for artist in artists:
+            self.ax.draw_artist(artist)
+        self.canvas.blit(self.ax.bbox)
     
     def refresh_ports(self):
         """刷新可用串口列表"""
@@ -388,8 +640,12 @@ class SerialMonitor(QMainWindow):
             return
         
         try:
-            self.serial_thread = SerialThread(port, baudrate, data_format, byteorder)
+            self.read_idx = 0
+            self._last_ts = time.time()
+            self._is_int16 = data_format == 'int16_t'
+            self.serial_thread = SerialThread(port, baudrate, data_format, byteorder, self.shared_buf)
             self.serial_thread.data_received.connect(self.on_data_received)
+            self.serial_thread.data_available.connect(self.on_data_available)
             self.serial_thread.error_occurred.connect(self.on_serial_error)
             self.serial_thread.start()
             
@@ -412,6 +668,8 @@ class SerialMonitor(QMainWindow):
             try:
                 self.serial_thread.stop()
                 self.serial_thread.wait()
+                # 取走线程退出前写入的剩余样本
+                self.drain_shared_buffer()
             except Exception as e:
                 print(f"断开串口连接时出错: {e}")
             finally:
@@ -420,50 +678,99 @@ class SerialMonitor(QMainWindow):
         self.connect_btn.setText("连接")
         self.status_label.setText("已断开连接")
     
+    def on_data_available(self, count):
+        """共享缓冲区有新样本写入，只更新字节计数，样本由定时器批量取走"""
+        self.bytes_received += 2 * count  # int16_t模式每个样本2字节
+    
+    def drain_shared_buffer(self):
+        """一次取走共享缓冲区中所有未读的int16_t样本并处理"""
+        if self.serial_thread is None:
+            return
+        write_idx = self.serial_thread.write_idx
+        size = len(self.shared_buf)
+        count = write_idx - self.read_idx
+        if count <= 0:
+            return
+        if count > size:
+            # 界面处理不及时，最旧的样本已被覆盖，只取最新的一圈
+            print(f"共享缓冲区溢出，丢弃 {count - size} 个样本")
+            count = size
+        start = (write_idx - count) % size
+        if start + count <= size:
+            samples = self.shared_buf[start:start + count]
+        else:
+            samples = np.concatenate((self.shared_buf[start:], self.shared_buf[:write_idx % size]))
+        self.read_idx = write_idx
+        self.on_data_received(samples)
+    
     def on_data_received(self, data):
-        """处理接收到的数据"""
+        """处理接收到的数据（int16_t模式为从共享缓冲区取出的一批样本，文本模式为一行数据）"""
         try:
             timestamp = time.time()
             
-            # 更新统计信息
-            self.data_points += 1
-            if hasattr(self.serial_thread, 'data_format') and self.serial_thread.data_format == 'int16_t':
-                self.bytes_received += 2  # int16_t模式每次接收2字节
+            if self._is_int16:
+                # 一批样本同时到达，在上一批的时间戳与当前时间之间均匀分布，保证时间戳单调且不依赖采样率设置
+                count = len(data)
+                timestamps = np.linspace(min(self._last_ts, timestamp), timestamp, count + 1)[1:]
+                self._last_ts = timestamp
+                # 数据显示区只显示最新10条，只为最后10个样本构造显示条目
+                entries = [(t, [v]) for t, v in zip(timestamps[-10:].tolist(), data[-10:].tolist())]
+                
+                # 更新统计信息（接收字节数在on_data_available中累计）
+                self.data_points += count
+                
+                # 添加到数据缓冲区
+                self.time_buffer.extend(timestamps)
+                self.value_buffer.extend(data)
+                
+                # 除以3277得到加速度值（单精度乘以倒数）并添加到加速度缓冲区
+                self.acceleration_buffer.extend(data * ACCELERATION_SCALE)
+                
+                # 如果正在记录，保存数据
+                if self.is_recording:
+                    self.append_recording(timestamps, data)
             else:
+                data = data.tolist()
+                entries = [(timestamp, data)]
+                
+                # 更新统计信息
+                self.data_points += 1
                 self.bytes_received += len(str(data).encode())
-            
-            # 添加到数据缓冲区
-            self.data_buffer.append((timestamp, data))
-            
-            # 转换为加速度值并添加到加速度缓冲区
-            if hasattr(self.serial_thread, 'data_format') and self.serial_thread.data_format == 'int16_t':
-                if isinstance(data, list) and len(data) > 0:
-                    int16_value = data[0]
-                    # 除以3277得到加速度值
-                    acceleration = int16_value / 3277.0
-                    self.acceleration_buffer.append((timestamp, acceleration))
+                
+                # 添加到数据缓冲区
+                if data:
+                    self.time_buffer.extend([timestamp])
+                    self.value_buffer.extend(data[:1])
+                
+                # 如果正在记录，保存数据（取每行第一个数值）
+                if self.is_recording:
+                    self.append_recording([timestamp], data[:1] or [0])
             
             # 添加到待处理数据列表（减少UI更新频率）
-            self.pending_data.append((timestamp, data))
-            
-            # 如果正在记录，保存数据
-            if self.is_recording:
-                self.recorded_data.append((timestamp, data))
+            self.pending_data.extend(entries)
+            self._plot_dirty = True
         except Exception as e:
             print(f"处理接收数据时出错: {e}")
     
+    def append_recording(self, timestamps, values):
+        """追加一批记录数据，容量不足时按两倍扩容"""
+        end = self.rec_n + len(values)
+        if end > len(self.rec_ts):
+            capacity = max(end, 2 * len(self.rec_ts))
+            rec_ts = np.empty(capacity, dtype=self.rec_ts.dtype)
+            rec_val = np.empty(capacity, dtype=self.rec_val.dtype)
+            rec_ts[:self.rec_n] = self.rec_ts[:self.rec_n]
+            rec_val[:self.rec_n] = self.rec_val[:self.rec_n]
+            self.rec_ts, self.rec_val = rec_ts, rec_val
+        self.rec_ts[self.rec_n:end] = timestamps
+        self.rec_val[self.rec_n:end] = values
+        self.rec_n = end
+    
     def update_data_display(self, data):
         """更新数据显示"""
-        timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
+        timestamp = _fmt_hms(time.time())
         display_text = f"[{timestamp}] {data}\n"
         
-        # 限制显示行数
-        current_text = self.data_display.toPlainText()
-        lines = current_text.split('\n')
-        if len(lines) > 100:
-            lines = lines[-100:]
-            self.data_display.setPlainText('\n'.join(lines))
-        
         self.data_display.append(display_text)
         
         # 滚动到底部
@@ -478,7 +785,7 @@ class SerialMonitor(QMainWindow):
     def change_ui_frequency(self):
         """改变UI更新频率"""
         frequency = self.ui_freq_spin.value()
-        self.ui_update_timer.setInterval(frequency)
+        self.ui_interval_ms = frequency
         print(f"UI更新频率已调整为: {frequency}ms")
     
     def on_display_mode_changed(self):
@@ -502,61 +809,81 @@ class SerialMonitor(QMainWindow):
             print(f"清除颜色条时出错: {e}")
         
         self.canvas.draw()
+        self._plot_dirty = True
     
     def on_sample_rate_changed(self):
         """采样率改变事件"""
         self.sample_rate = self.sample_rate_spin.value()
+        self.prepare_fft()
+        self._plot_dirty = True
         print(f"采样率已调整为: {self.sample_rate} Hz")
     
     def on_window_length_changed(self):
         """窗口长度改变事件"""
         self.window_length = self.window_length_spin.value()
         self.overlap = self.window_length // 2  # 自动设置重叠长度
+        self.prepare_fft()
+        self._plot_dirty = True
         print(f"FFT窗口长度已调整为: {self.window_length} 点")
     
+    def on_max_freq_changed(self):
+        """最大频率改变事件"""
+        self.max_freq = self.max_freq_spin.value()
+        self.prepare_fft()
+        self._plot_dirty = True
+    
+    def prepare_fft(self):
+        """按当前窗口长度、采样率和最大频率预计算窗函数、FFT长度和频率轴，避免每帧重复计算"""
+        self.fft_window = signal.get_window('hann', self.window_length).astype(np.float32)
+        self.fft_window_power = float(np.sum(self.fft_window ** 2))
+        # FFT长度补零到最近的快速长度，避免窗口长度含大素因子时变慢
+        self.nfft = next_fast_len(self.window_length, real=True)
+        
+        # 频率轴升序排列，限制频率范围即只保留前fft_bins个频点
+        freqs = rfftfreq(self.nfft, 1.0 / self.sample_rate)
+        if 0 < self.max_freq <= self.sample_rate // 2:  # 确保不超过奈奎斯特频率
+            self.fft_bins = int(np.count_nonzero(freqs <= self.max_freq))
+        else:
+            self.fft_bins = len(freqs)
+        self.fft_freqs = freqs[:self.fft_bins]
+    
     def update_ui(self):
         """批量更新UI（由定时器调用）"""
         try:
-            # 批量更新数据显示
-            if self.pending_data:
+            # 批量取走接收线程写入共享缓冲区的样本
+            self.drain_shared_buffer()
+            
+            # 批量更新数据显示（数据显示框不可见时跳过格式化）
+            if self.pending_data and self.data_display.isVisible():
                 # 只显示最新的几条数据
                 recent_data = self.pending_data[-10:]  # 只显示最新10条
                 display_text = ""
                 
                 for timestamp, data in recent_data:
-                    time_str = datetime.fromtimestamp(timestamp).strftime("%H:%M:%S.%f")[:-3]
-                    display_text += f"[{time_str}] {data}\n"
+                    display_text += f"[{_fmt_hms(timestamp)}] {data}\n"
                 
                 # 更新显示
-                current_text = self.data_display.toPlainText()
-                lines = current_text.split('\n')
-                if len(lines) > 90:  # 保留90行，为新数据留空间
-                    lines = lines[-90:]
-                    self.data_display.setPlainText('\n'.join(lines))
-                
                 self.data_display.append(display_text)
                 
                 # 滚动到底部
                 cursor = self.data_display.textCursor()
                 cursor.movePosition(cursor.End)
                 self.data_display.setTextCursor(cursor)
-                
-                # 清空待处理数据
-                self.pending_data.clear()
+            
+            # 清空待处理数据
+            self.pending_data.clear()
             
             # 更新统计显示
             self.update_stats_display()
             
             # 显示加速度信息
             if hasattr(self, 'info_text') and len(self.acceleration_buffer) > 0:
-                accel_values = [item[1] for item in self.acceleration_buffer]
-                if len(accel_values) > 0:
-                    try:
-                        mean_accel = np.mean(accel_values)
-                        std_accel = np.std(accel_values)
-                        self.info_text.append(f"加速度统计: 均值={mean_accel:.3f}, 标准差={std_accel:.3f}")
-                    except Exception as e:
-                        print(f"计算加速度统计时出错: {e}")
+                try:
+                    # 均值和标准差由缓冲区维护的和与平方和得到
+                    mean_accel, std_accel = self.acceleration_buffer.mean_std()
+                    self.info_text.append(f"加速度统计: 均值={mean_accel:.3f}, 标准差={std_accel:.3f}")
+                except Exception as e:
+                    print(f"计算加速度统计时出错: {e}")
             
             # 更新记录进度
             if self.is_recording:
@@ -578,124 +905,181 @@ class SerialMonitor(QMainWindow):
         except Exception as e:
             print(f"更新UI时出错: {e}")
     
-    def update_plot(self, frame):
+    def _tick(self):
+        """定时任务：先更新界面，到达间隔时再更新图表，完成后才安排下一次，避免两者重叠执行"""
+        start = time.perf_counter()
+        try:
+            self.update_ui()
+            if start - self._last_plot >= PLOT_INTERVAL:
+                self._last_plot = start
+                self.update_plot()
+        except Exception as e:
+            print(f"定时更新时出错: {e}")
+        finally:
+            # 扣除本次耗时，处理变慢时间隔自动拉长而不会积压定时事件
+            elapsed_ms = int((time.perf_counter() - start) * 1000)
+            QTimer.singleShot(max(1, self.ui_interval_ms - elapsed_ms), self._tick)
+    
+    def update_plot(self):
         """更新图表"""
+        # 没有新数据或图表不可见时跳过
+        if not self._plot_dirty or not self.canvas.isVisible():
+            return
+        self._plot_dirty = False
+        
         display_mode = self.display_mode_combo.currentText()
         
         if display_mode == '时频图':
-            self.update_spectrogram()
+            artists = self.update_spectrogram()
         else:
-            self.update_waveform()
-        
-        return []
+            artists = self.update_waveform()
+        if artists:
+            self.blit_artists(artists)
     
     def update_spectrogram(self):
         """更新时频图"""
         if len(self.acceleration_buffer) < self.window_length:
-            return
+            return []
         
         try:
-            # 获取加速度数据并转换为numpy数组
-            accel_data = np.array([item[1] for item in self.acceleration_buffer])
-            
-            # 去除均值
-            accel_data = accel_data - np.mean(accel_data)
-            
-            # 计算短时FFT
-            frequencies, times, Sxx = signal.spectrogram(
-                accel_data,
-                fs=self.sample_rate,
-                window='hann',
-                nperseg=self.window_length,
-                noverlap=self.overlap,
-                scaling='density'
-            )
+            # 获取加速度数据
+            accel_data = self.acceleration_buffer.get()
             
-            # 转换为dB
-            Sxx_db = 10 * np.log10(Sxx + 1e-10)
+            # 分帧，每帧去除均值后加窗
+            hop = self.window_length - self.overlap
+            frames = frame_and_window(accel_data, hop, self.fft_window)
             
-            # 限制频率范围
-            max_freq = self.max_freq_spin.value()
-            if max_freq > 0 and max_freq <= self.sample_rate // 2:  # 确保不超过奈奎斯特频率
-                freq_mask = frequencies <= max_freq
-                frequencies = frequencies[freq_mask]
-                Sxx_db = Sxx_db[freq_mask, :]
+            # 计算短时FFT：实数输入只计算非负频率，所有帧一次批量变换
+            # 只保留显示范围内的频点，后续功率和dB只对这些频点计算
+            spectrum = rfft(frames, n=self.nfft, axis=1, workers=-1)[:, :self.fft_bins]
             
-            # 清除旧图表
-            self.ax.clear()
+            # 功率谱密度 |X|^2 = re^2 + im^2（无需开方），原地累加减少临时数组
+            # 单边谱除直流和奈奎斯特频点外乘2
+            Sxx = np.square(spectrum.real)
+            Sxx += np.square(spectrum.imag)
+            Sxx = Sxx.T
+            Sxx /= self.sample_rate * self.fft_window_power
+            Sxx[1:self.nfft // 2 if self.nfft % 2 == 0 else None] *= 2
+            frequencies = self.fft_freqs
+            times = (self.window_length / 2 + hop * np.arange(frames.shape[0])) / self.sample_rate
             
-            # 绘制时频图
-            im = self.ax.pcolormesh(times, frequencies, Sxx_db,
-                                  cmap='viridis', shading='gouraud')
+            # 转换为dB（float32原地计算，不产生临时数组）
+            Sxx_db = Sxx
+            Sxx_db += 1e-10
+            np.log10(Sxx_db, out=Sxx_db)
+            Sxx_db *= 10
             
-            # 设置标签和标题
-            self.ax.set_xlabel('时间 (秒)')
-            self.ax.set_ylabel('频率 (Hz)')
-            self.ax.set_title('实时时频图 (加速度频谱)')
-            self.ax.grid(True, alpha=0.3)
+            full_redraw = False
+            image_key = (self.sample_rate, self.nfft, hop, Sxx_db.shape)
+            if (self.spec_image is None or self.spec_image not in self.ax.images
+                    or image_key != self.spec_image_key):
+                # 图像不存在或坐标变化时清除旧图表并重新创建图像
+                self.ax.clear()
+                
+                # 绘制时频图：时间和频率均匀分布，用imshow整块贴图，范围取首末像素中心各向外半格
+                dt = hop / self.sample_rate
+                df = self.sample_rate / self.nfft
+                extent = [times[0] - dt / 2, times[-1] + dt / 2,
+                          frequencies[0] - df / 2, frequencies[-1] + df / 2]
+                self.spec_image = self.ax.imshow(Sxx_db, origin='lower', aspect='auto', extent=extent,
+                                                 cmap='viridis', interpolation='nearest', animated=True)
+                self.spec_image_key = image_key
+                
+                # 设置标签和标题
+                self.ax.set_xlabel('时间 (秒)')
+                self.ax.set_ylabel('频率 (Hz)')
+                self.ax.set_title('实时时频图 (加速度频谱)')
+                self.ax.grid(True, alpha=0.3)
+                
+                # 添加颜色条
+                try:
+                    if not hasattr(self, 'colorbar') or self.colorbar is None:
+                        self.colorbar = self.figure.colorbar(self.spec_image, ax=self.ax)
+                        self.colorbar.set_label('功率谱密度 (dB/Hz)')
+                    else:
+                        self.colorbar.update_normal(self.spec_image)
+                except Exception as e:
+                    print(f"创建或更新颜色条时出错: {e}")
+                    # 如果颜色条创建失败，继续执行但不显示颜色条
+                    pass
+                full_redraw = True
+            else:
+                # 只更新图像数据
+                self.spec_image.set_data(Sxx_db)
             
-            # 添加颜色条
-            try:
-                if not hasattr(self, 'colorbar') or self.colorbar is None:
-                    self.colorbar = self.figure.colorbar(im, ax=self.ax)
-                    self.colorbar.set_label('功率谱密度 (dB/Hz)')
-                else:
-                    self.colorbar.update_normal(im)
-            except Exception as e:
-                print(f"创建或更新颜色条时出错: {e}")
-                # 如果颜色条创建失败，继续执行但不显示颜色条
-                pass
+            # 颜色范围按10dB取整，数据跨过整10dB时才改变，避免颜色条每帧重绘
+            clim = (float(np.floor(Sxx_db.min() / 10) * 10), float(np.ceil(Sxx_db.max() / 10) * 10))
+            if clim != self.spec_image.get_clim():
+                self.spec_image.set_clim(*clim)
+                full_redraw = True
             
-            # 刷新画布
-            self.canvas.draw()
+            # 坐标轴或颜色条变化时整图重绘，否则只blit重画图像
+            if full_redraw:
+                self.canvas.draw()
+            return [self.spec_image]
             
         except Exception as e:
             print(f"更新时频图时出错: {e}")
             # 如果时频图更新失败，尝试显示波形图
             try:
-                self.update_waveform()
+                return self.update_waveform()
             except Exception as e2:
                 print(f"更新波形图也失败: {e2}")
+                return []
     
     def update_waveform(self):
         """更新波形图"""
-        if not self.data_buffer:
-            return
-        
         # 获取最新的数据点
         max_points = 500  # 固定显示点数
-        recent_data = list(self.data_buffer)[-max_points:]
         
         # 如果数据没有变化，跳过更新
-        if len(recent_data) < 2:
-            return
+        if len(self.value_buffer) < 2:
+            return []
         
-        times = [item[0] for item in recent_data]
-        values = [item[1][0] if isinstance(item[1], list) else item[1] for item in recent_data]
+        times = self.time_buffer.get(max_points)
+        values = self.value_buffer.get(max_points)
         
-        # 清除旧图表
-        self.ax.clear()
+        # 将时间转换为相对时间
+        relative_times = times - times[0]
         
-        # 绘制新数据
-        if times and values:
-            # 将时间转换为相对时间
-            start_time = times[0]
-            relative_times = [t - start_time for t in times]
-            
-            # 使用更高效的绘图方式
-            self.ax.plot(relative_times, values, 'b-', linewidth=0.8, alpha=0.8)
+        # 点数超过坐标轴像素宽度的两倍时做最小/最大值抽取，保留波形包络
+        n_out = int(self.ax.bbox.width)
+        if n_out > 0 and len(values) > 2 * n_out:
+            relative_times, values = minmax_decimate(relative_times, values, n_out)
+        
+        full_redraw = False
+        if self.wave_line is None or self.wave_line not in self.ax.lines:
+            # 曲线不存在（首次绘制或坐标轴被清除过）时重新创建
+            self.ax.clear()
+            self.wave_line, = self.ax.plot(relative_times, values, 'b-', linewidth=0.8, alpha=0.8,
+                                           animated=True)
             
             self.ax.set_title("实时数据波形")
             self.ax.set_xlabel("时间 (秒)")
             self.ax.set_ylabel("数值")
             self.ax.grid(True, alpha=0.3)
-        
-        # 刷新画布
-        self.canvas.draw()
+            full_redraw = True
+        else:
+            # 只更新曲线数据
+            self.wave_line.set_data(relative_times, values)
+        
+        # 数据超出坐标范围或只占一小部分时才调整范围
+        xlim = fit_limits(self.ax.get_xlim(), relative_times[0], relative_times[-1])
+        ylim = fit_limits(self.ax.get_ylim(), values.min(), values.max())
+        if xlim != self.ax.get_xlim() or ylim != self.ax.get_ylim():
+            self.ax.set_xlim(xlim)
+            self.ax.set_ylim(ylim)
+            full_redraw = True
+        
+        # 坐标轴变化时整图重绘，否则只blit重画曲线
+        if full_redraw:
+            self.canvas.draw()
+        return [self.wave_line]
     
     def clear_plot(self):
         """清除图表"""
-        self.data_buffer.clear()
+        self.time_buffer.clear()
+        self.value_buffer.clear()
         self.acceleration_buffer.clear()
         self.ax.clear()
         
@@ -748,7 +1132,10 @@ class SerialMonitor(QMainWindow):
     def start_recording(self):
         """开始记录"""
         self.is_recording = True
-        self.recorded_data = []
+        # 数值统一按双精度记录，可精确表示int16_t样本，记录中切换数据格式也不会截断文本模式的浮点数值
+        self.rec_ts = np.empty(RECORD_INITIAL_SIZE, dtype=np.float64)
+        self.rec_val = np.empty(RECORD_INITIAL_SIZE, dtype=np.float64)
+        self.rec_n = 0
         self.record_btn.setText("停止记录")
         self.record_status.setText("正在记录...")
         self.record_progress.setVisible(True)
@@ -758,21 +1145,21 @@ class SerialMonitor(QMainWindow):
         """停止记录"""
         self.is_recording = False
         self.record_btn.setText("开始记录")
-        self.record_status.setText(f"已记录 {len(self.recorded_data)} 个数据点")
+        self.record_status.setText(f"已记录 {self.rec_n} 个数据点")
         self.record_progress.setVisible(False)
         
-        if self.recorded_data:
+        if self.rec_n:
             self.save_btn.setEnabled(True)
     
     def update_record_progress(self):
         """更新记录进度"""
-        if self.recorded_data:
-            progress = min(100, len(self.recorded_data) // 10)
+        if self.rec_n:
+            progress = min(100, self.rec_n // 10)
             self.record_progress.setValue(progress)
     
     def save_csv(self):
         """保存数据为CSV文件"""
-        if not self.recorded_data:
+        if not self.rec_n:
             QMessageBox.warning(self, "警告", "没有数据可保存")
             return
         
@@ -782,19 +1169,11 @@ class SerialMonitor(QMainWindow):
         
         if filename:
             try:
-                with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-                    writer = csv.writer(csvfile)
-                    
-                    # 写入表头
-                    writer.writerow(['时间戳', '数值'])
-                    
-                    # 写入数据
-                    for timestamp, data in self.recorded_data:
-                        if isinstance(data, list):
-                            value = data[0] if data else 0
-                        else:
-                            value = data
-                        writer.writerow([timestamp, value])
+                # 时间戳和数值两列一次写出，%.10g格式下int16_t样本仍输出为整数
+                n = self.rec_n
+                np.savetxt(filename, np.column_stack((self.rec_ts[:n], self.rec_val[:n])),
+                           fmt=('%.6f', '%.10g'), delimiter=',', header='时间戳,数值',
+                           comments='', encoding='utf-8')
                 
                 QMessageBox.information(self, "成功", f"数据已保存到 {filename}")
                 
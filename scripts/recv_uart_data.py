@@ -4,26 +4,50 @@
 串口数据接收和FFT分析脚本
 功能：
 1. 接收串口数据并解析为int格式
-2. 保存数据到xlsx文件
+2. 保存数据到Parquet文件（可选xlsx）
 3. 对数据进行FFT分析，输出频率成分
 """
 
 import serial
-import struct
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-from scipy.fft import fft, fftfreq
+from scipy.fft import rfft, rfftfreq, next_fast_len
+from scipy.signal import find_peaks, get_window
 import time
 import os
 from datetime import datetime
 import argparse
 
+try:
+    import xlsxwriter
+except ImportError:
+    # 未安装xlsxwriter时由pandas默认引擎写xlsx
+    xlsxwriter = None
+
 # 设置matplotlib中文字体
 plt.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'DejaVu Sans']
 plt.rcParams['axes.unicode_minus'] = False
 
+# 频谱图最多绘制的分段数（每段保留最小值和最大值两个点），不低于保存图片的像素宽度
+PLOT_MAX_SEGMENTS = 4000
+
+# 支持的输出文件格式（同时也是对应的文件扩展名）
+OUTPUT_FORMATS = ('parquet', 'xlsx')
+
+def _minmax_decimate(x, y, n_out):
+    """把数据按顺序分成n_out段，每段保留最小值和最大值，返回 (x, y)，共2*n_out个点"""
+    starts = np.linspace(0, len(y), n_out, endpoint=False).astype(np.intp)
+    y_out = np.empty(2 * n_out, dtype=y.dtype)
+    y_out[0::2] = np.minimum.reduceat(y, starts)
+    y_out[1::2] = np.maximum.reduceat(y, starts)
+    return np.repeat(x[starts], 2), y_out
+
 class UartDataReceiver:
+    # 驱动接收缓冲区大小和单次读取的最大字节数
+    RX_BUFFER_SIZE = 1 << 20
+    MAX_READ_BYTES = 1 << 16
+    
     def __init__(self, port='COM31', baudrate=921600, timeout=1):
         """
         初始化串口接收器
@@ -37,8 +61,39 @@ class UartDataReceiver:
         self.baudrate = baudrate
         self.timeout = timeout
         self.serial_conn = None
-        self.data_buffer = []
-        self.timestamps = []
+        # 数据和时间戳分别连续存放在预分配的numpy数组中，count为已接收的数据点数
+        self._values = np.empty(0, dtype=np.int32)
+        self._times = np.empty(0, dtype=np.float64)
+        self.count = 0
+    
+    @property
+    def data_buffer(self):
+        """已接收的数据（数组视图，不拷贝）"""
+        return self._values[:self.count]
+    
+    @property
+    def timestamps(self):
+        """已接收数据的时间戳（数组视图，不拷贝）"""
+        return self._times[:self.count]
+    
+    def _reserve(self, capacity):
+        """确保缓冲区至少能容纳capacity个数据点，不足时按两倍扩容"""
+        if capacity <= len(self._values):
+            return
+        capacity = max(capacity, 2 * len(self._values))
+        values = np.empty(capacity, dtype=self._values.dtype)
+        times = np.empty(capacity, dtype=self._times.dtype)
+        values[:self.count] = self.data_buffer
+        times[:self.count] = self.timestamps
+        self._values, self._times = values, times
+    
+    def _append(self, values, timestamps):
+        """追加一批数据及其时间戳"""
+        end = self.count + len(values)
+        self._reserve(end)
+        self._values[self.count:end] = values
+        self._times[self.count:end] = timestamps
+        self.count = end
         
     def connect(self):
         """连接串口"""
@@ -49,11 +104,21 @@ class UartDataReceiver:
                 timeout=self.timeout
             )
             print(f"成功连接到串口 {self.port}")
+            self.enlarge_rx_buffer()
             return True
         except serial.SerialException as e:
             print(f"连接串口失败: {e}")
             return False
     
+    def enlarge_rx_buffer(self):
+        """增大驱动的接收缓冲区，receive_data两次读取之间到达的数据先存放在驱动中"""
+        if not hasattr(self.serial_conn, 'set_buffer_size'):
+            return
+        try:
+            self.serial_conn.set_buffer_size(rx_size=self.RX_BUFFER_SIZE)
+        except (ValueError, OSError, serial.SerialException) as e:
+            print(f"设置接收缓冲区失败: {e}")
+    
     def disconnect(self):
         """断开串口连接"""
         if self.serial_conn and self.serial_conn.is_open:
@@ -74,36 +139,71 @@ class UartDataReceiver:
         
         print(f"开始接收数据，时长: {duration}秒，采样率: {sample_rate}Hz")
         
+        # 按预计的数据点数预先分配缓冲区
+        self._reserve(self.count + int(duration * sample_rate))
+        
         start_time = time.time()
-        sample_interval = 1.0 / sample_rate
+        next_report = 5  # 下次显示进度的时间（秒）
+        pending = b''  # 上次读取剩余的不足一个int的字节
         
         while time.time() - start_time < duration:
-            if self.serial_conn.in_waiting >= 4:  # 假设每个int是4字节
-                try:
-                    # 读取4字节数据并解析为int
-                    raw_data = self.serial_conn.read(4)
-                    if len(raw_data) == 4:
-                        # 解析为32位有符号整数
-                        value = struct.unpack('<i', raw_data)[0]
-                        self.data_buffer.append(value)
-                        self.timestamps.append(time.time() - start_time)
-                        
-                        # 控制采样率
-                        time.sleep(sample_interval)
-                        
-                        # 显示进度
-                        elapsed = time.time() - start_time
-                        if int(elapsed) % 5 == 0 and elapsed > 0:
-                            print(f"已接收 {len(self.data_buffer)} 个数据点，用时 {elapsed:.1f}秒")
-                            
-                except struct.error as e:
-                    print(f"数据解析错误: {e}")
-                    continue
-                except Exception as e:
-                    print(f"接收数据错误: {e}")
-                    break
-        
-        print(f"数据接收完成，共接收 {len(self.data_buffer)} 个数据点")
+            try:
+                # 一次读取缓冲区中所有可用字节（最多MAX_READ_BYTES），无数据时阻塞等待（最长为超时时间），读取速度由数据到达决定
+                raw_data = pending + self.serial_conn.read(max(4, min(self.serial_conn.in_waiting, self.MAX_READ_BYTES)))
+                
+                # 每4字节解析为一个int（假设每个int是4字节），不足4字节的留到下次
+                usable = len(raw_data) - len(raw_data) % 4
+                pending = raw_data[usable:]
+                if usable:
+                    # 整块解析为32位有符号整数
+                    values = np.frombuffer(raw_data, dtype='<i4', count=usable // 4)
+                    
+                    # 时间戳按样本序号和采样率推算，不再逐个调用time.time()
+                    first = self.count
+                    self._append(values, np.arange(first, first + len(values)) / sample_rate)
+                
+                # 每5秒显示一次进度
+                elapsed = time.time() - start_time
+                if elapsed >= next_report:
+                    print(f"已接收 {self.count} 个数据点，用时 {elapsed:.1f}秒")
+                    next_report += 5
+                    
+            except Exception as e:
+                print(f"接收数据错误: {e}")
+                break
+        
+        print(f"数据接收完成，共接收 {self.count} 个数据点")
+    
+    def _to_dataframe(self):
+        """把已接收的数据转换为DataFrame"""
+        return pd.DataFrame({
+            'Timestamp': self.timestamps,
+            'Value': self.data_buffer
+        })
+    
+    def save_to_parquet(self, filename=None):
+        """
+        保存数据到Parquet文件（列式二进制格式，写入速度和文件大小均远优于xlsx）
+        
+        Args:
+            filename: 文件名，如果为None则自动生成
+        """
+        if not self.count:
+            print("没有数据可保存")
+            return
+        
+        if filename is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = f"uart_data_{timestamp}.parquet"
+        
+        try:
+            self._to_dataframe().to_parquet(filename, index=False, compression='zstd')
+        except ImportError as e:
+            # 未安装pyarrow等Parquet引擎时改为保存xlsx
+            print(f"保存Parquet失败: {e}，改为保存xlsx")
+            return self.save_to_xlsx(os.path.splitext(filename)[0] + '.xlsx')
+        print(f"数据已保存到: {filename}")
+        return filename
     
     def save_to_xlsx(self, filename=None):
         """
@@ -112,7 +212,7 @@ class UartDataReceiver:
         Args:
             filename: 文件名，如果为None则自动生成
         """
-        if not self.data_buffer:
+        if not self.count:
             print("没有数据可保存")
             return
         
@@ -120,45 +220,73 @@ class UartDataReceiver:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"uart_data_{timestamp}.xlsx"
         
-        # 创建DataFrame
-        df = pd.DataFrame({
-            'Timestamp': self.timestamps,
-            'Value': self.data_buffer
-        })
-        
         # 保存到xlsx
-        df.to_excel(filename, index=False)
+        if xlsxwriter is not None:
+            # constant_memory模式逐行写入磁盘，不在内存中保留整张表
+            # pandas按列输出单元格，与逐行模式不兼容，因此直接按行写入
+            workbook = xlsxwriter.Workbook(filename, {'constant_memory': True})
+            try:
+                worksheet = workbook.add_worksheet()
+                worksheet.write_row(0, 0, ('Timestamp', 'Value'))
+                for row, values in enumerate(zip(self.timestamps.tolist(), self.data_buffer.tolist()), 1):
+                    worksheet.write_row(row, 0, values)
+            finally:
+                # 出错时也关闭工作簿，删除逐行模式的临时文件
+                workbook.close()
+        else:
+            self._to_dataframe().to_excel(filename, index=False)
         print(f"数据已保存到: {filename}")
         return filename
     
-    def perform_fft(self, sample_rate=1000):
+    def perform_fft(self, sample_rate=1000, fft_size=None):
         """
         对数据进行FFT分析
         
         Args:
             sample_rate: 采样率（Hz）
+            fft_size: 分段FFT长度，为None时整段数据做一次FFT，否则对各段频谱取平均
         """
-        if not self.data_buffer:
+        if fft_size is not None and fft_size < 2:
+            raise ValueError(f"分段FFT长度必须不小于2: {fft_size}")
+        
+        if not self.count:
             print("没有数据可进行FFT分析")
             return
         
-        # 转换为numpy数组
-        data = np.array(self.data_buffer)
+        # 数据已连续存放在numpy数组中，直接使用视图
+        data = self.data_buffer
         
-        # 执行FFT
-        fft_result = fft(data)
-        
-        # 计算频率轴
+        # FFT用单精度计算，速度约为双精度的两倍
+        # 原始数据为32位整数，先以双精度去掉均值再转为单精度，避免大直流偏置下转换时损失有效位数
+        # 去掉的直流分量在变换后加回直流频点
         n = len(data)
-        freq = fftfreq(n, 1/sample_rate)
-        
-        # 计算幅度谱
-        magnitude = np.abs(fft_result)
+        mean = np.mean(data)
+        data_f32 = (data - mean).astype(np.float32)
+        if fft_size and fft_size < n:
+            # 分段FFT：切分为50%重叠的帧（视图，不拷贝），加汉宁窗后所有帧一次批量变换
+            nfft = fft_size
+            window = get_window('hann', fft_size).astype(np.float32)
+            frames = np.lib.stride_tricks.sliding_window_view(data_f32, fft_size)[::fft_size // 2]
+            fft_result = rfft(frames * window, axis=-1, workers=-1)
+            fft_result[:, 0] += mean * window.sum(dtype=np.float64)
+            
+            # 计算幅度谱：各帧功率取平均后开方（Welch法），避免直接平均幅度在噪声上产生偏差
+            magnitude_positive = np.sqrt((fft_result.real ** 2 + fft_result.imag ** 2).mean(axis=0))
+        else:
+            # FFT长度补零到最近的快速长度，避免数据点数含大素因子时变慢
+            nfft = next_fast_len(n, real=True)
+            
+            # 执行FFT：实数输入只计算非负频率部分
+            # 已去掉直流分量，补零时直流不会泄漏到低频形成假峰值
+            fft_result = rfft(data_f32, n=nfft, workers=-1)
+            fft_result[0] += mean * n
+            
+            # 计算幅度谱
+            magnitude_positive = np.abs(fft_result)
         
-        # 只取正频率部分
-        positive_freq_mask = freq >= 0
-        freq_positive = freq[positive_freq_mask]
-        magnitude_positive = magnitude[positive_freq_mask]
+        # 计算频率轴，频率分辨率为补零后FFT长度对应的频点间隔
+        freq_positive = rfftfreq(nfft, 1/sample_rate)
+        resolution = sample_rate / nfft
         
         # 找到主要频率成分
         peak_indices = self._find_peaks(magnitude_positive)
@@ -166,7 +294,10 @@ class UartDataReceiver:
         print("\n=== FFT分析结果 ===")
         print(f"数据点数: {n}")
         print(f"采样率: {sample_rate} Hz")
-        print(f"频率分辨率: {sample_rate/n:.2f} Hz")
+        print(f"FFT长度: {nfft}")
+        if fft_result.ndim == 2:
+            print(f"分段数: {fft_result.shape[0]}")
+        print(f"频率分辨率: {resolution:.2f} Hz")
         print(f"最大频率: {sample_rate/2:.1f} Hz")
         
         print("\n主要频率成分:")
@@ -183,17 +314,12 @@ class UartDataReceiver:
     def _find_peaks(self, magnitude, threshold_ratio=0.1):
         """找到频谱中的峰值"""
         threshold = np.max(magnitude) * threshold_ratio
-        peaks = []
         
-        for i in range(1, len(magnitude) - 1):
-            if (magnitude[i] > magnitude[i-1] and 
-                magnitude[i] > magnitude[i+1] and 
-                magnitude[i] > threshold):
-                peaks.append(i)
+        # 局部极大值且超过阈值的点，由scipy在C层一次找出
+        peaks, _ = find_peaks(magnitude, height=threshold)
         
-        # 按幅度排序
-        peaks.sort(key=lambda x: magnitude[x], reverse=True)
-        return peaks
+        # 按幅度从大到小排序
+        return peaks[np.argsort(-magnitude[peaks], kind='stable')]
     
     def _plot_spectrum(self, freq, magnitude, sample_rate):
         """绘制频谱图"""
@@ -203,9 +329,15 @@ class UartDataReceiver:
         
         plt.figure(figsize=(12, 8))
         
+        # 点数远多于图片像素时按段抽取最小/最大值，保留频谱包络，绘制耗时与像素数而不是数据点数相关
+        # 坐标范围仍按完整数据计算
+        plot_freq, plot_magnitude = freq, magnitude
+        if len(magnitude) > 2 * PLOT_MAX_SEGMENTS:
+            plot_freq, plot_magnitude = _minmax_decimate(freq, magnitude, PLOT_MAX_SEGMENTS)
+        
         # 主频谱图
         plt.subplot(2, 1, 1)
-        plt.plot(freq, magnitude)
+        plt.plot(plot_freq, plot_magnitude)
         plt.xlabel('频率 (Hz)')
         plt.ylabel('幅度')
         plt.title('FFT频谱分析')
@@ -228,7 +360,7 @@ class UartDataReceiver:
         
         # 对数坐标频谱图
         plt.subplot(2, 1, 2)
-        plt.semilogy(freq, magnitude)
+        plt.semilogy(plot_freq, plot_magnitude)
         plt.xlabel('频率 (Hz)')
         plt.ylabel('幅度 (对数)')
         plt.title('FFT频谱分析 (对数坐标)')
@@ -260,6 +392,13 @@ class UartDataReceiver:
         
         plt.show()
 
+def _fft_size(value):
+    """argparse类型检查：分段FFT长度为不小于2的整数（50%重叠的帧移为长度的一半）"""
+    size = int(value)
+    if size < 2:
+        raise argparse.ArgumentTypeError(f"分段FFT长度必须不小于2: {value}")
+    return size
+
 def main():
     """主函数"""
     parser = argparse.ArgumentParser(description='串口数据接收和FFT分析工具')
@@ -268,9 +407,23 @@ def main():
     parser.add_argument('--duration', type=int, default=10, help='接收时长(秒) (默认: 10)')
     parser.add_argument('--sample-rate', type=int, default=1000, help='采样率(Hz) (默认: 1000)')
     parser.add_argument('--output', help='输出文件名')
+    parser.add_argument('--format', choices=OUTPUT_FORMATS,
+                        help='输出文件格式 (默认: 按--output的扩展名推断，无扩展名时为parquet)')
+    parser.add_argument('--fft-size', type=_fft_size, help='分段FFT长度，指定时对各段频谱取平均 (默认: 整段做一次FFT)')
     
     args = parser.parse_args()
     
+    # 根据--output的扩展名确定输出格式，不支持的扩展名或与--format冲突时报错
+    ext = os.path.splitext(args.output)[1].lower().lstrip('.') if args.output else ''
+    if ext:
+        if ext not in OUTPUT_FORMATS:
+            parser.error(f"不支持的--output扩展名 .{ext}，应为 " + ' 或 '.join('.' + f for f in OUTPUT_FORMATS))
+        if args.format and args.format != ext:
+            parser.error(f"--output扩展名 .{ext} 与 --format {args.format} 不一致")
+        args.format = ext
+    elif args.format is None:
+        args.format = 'parquet'
+    
     # 创建接收器
     receiver = UartDataReceiver(
         port=args.port,
@@ -289,11 +442,14 @@ def main():
         )
         
         # 保存数据
-        if receiver.data_buffer:
-            receiver.save_to_xlsx(args.output)
+        if receiver.count:
+            if args.format == 'xlsx':
+                receiver.save_to_xlsx(args.output)
+            else:
+                receiver.save_to_parquet(args.output)
             
             # 进行FFT分析
-            receiver.perform_fft(args.sample_rate)
+            receiver.perform_fft(args.sample_rate, args.fft_size)
         
     except KeyboardInterrupt:
         print("\n用户中断程序")
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+online_analyze.py 的测试
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+import numpy as np
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from PyQt5.QtWidgets import QApplication
+
+import online_analyze
+
+
+class RecordingTimestampTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.monitor = online_analyze.SerialMonitor()
+        self.monitor._is_int16 = True
+
+    def tearDown(self):
+        self.monitor.close()
+
+    def test_batches_with_mismatched_rate_stay_monotonic(self):
+        """采样率设置与实际速率不符时，记录的时间戳仍单调且覆盖实际经过的时间"""
+        # 实际约10kHz：每100ms取出1000个样本，而采样率保持默认的1000Hz
+        self.monitor.sample_rate = 1000
+        start = 1000.0
+        self.monitor._last_ts = start
+        self.monitor.start_recording()
+        for i in range(10):
+            with mock.patch.object(online_analyze.time, 'time', return_value=start + 0.1 * (i + 1)):
+                self.monitor.on_data_received(np.arange(1000, dtype=np.int16))
+
+        rec_ts = self.monitor.rec_ts[:self.monitor.rec_n]
+        self.assertEqual(len(rec_ts), 10000)
+        self.assertTrue(np.all(np.diff(rec_ts) >= 0))
+        self.assertAlmostEqual(rec_ts[-1] - start, 1.0)
+        self.assertGreater(rec_ts[0], start)
+
+
+if __name__ == '__main__':
+    unittest.main()